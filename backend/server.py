@@ -1,29 +1,67 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from cachetools import TTLCache
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
 from bson import ObjectId
+from gridfs.errors import NoFile
+from pymongo.errors import DuplicateKeyError
 import os
+import asyncio
+import orjson
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional
 import uuid
 from datetime import datetime
 import random
+import re
+import bcrypt
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(
+    mongo_url,
+    maxPoolSize=200,
+    minPoolSize=20,
+    maxIdleTimeMS=60000,
+    compressors="zstd,zlib",
+    retryWrites=True,
+    serverSelectionTimeoutMS=3000
+)
 db = client[os.environ['DB_NAME']]
+product_images = AsyncIOMotorGridFSBucket(db, bucket_name="product_images")
+
+# Active categories change rarely, so they're cached in-process for a minute
+categories_cache = TTLCache(maxsize=1, ttl=60)
+categories_cache_lock = asyncio.Lock()
+
+# GridFS chunk size used when streaming uploaded images in and out
+IMAGE_CHUNK_SIZE = 255 * 1024
 
-# Create the main app
-app = FastAPI()
+# Image uploads are limited to raster types (SVG can carry scripts and is
+# served from the API origin) and to a few megabytes
+ALLOWED_IMAGE_TYPES = frozenset({"image/png", "image/jpeg", "image/webp", "image/gif"})
+MAX_IMAGE_BYTES = 5 * 1024 * 1024
+
+# Create the main app; the schema is served under /api, the only prefix the
+# deployed ingress routes to the backend
+app = FastAPI(default_response_class=ORJSONResponse, openapi_url="/api/openapi.json")
 api_router = APIRouter(prefix="/api")
 
+# Admin password hash, computed once at import (defaults to the MVP password)
+_ADMIN_PASSWORD_HASH = (
+    os.environ.get('ADMIN_PASSWORD_HASH', '').encode()
+    or bcrypt.hashpw(b"admin123", bcrypt.gensalt())
+)
+
 # ============ MODELS ============
 
 class Address(BaseModel):
@@ -67,14 +105,28 @@ class Product(BaseModel):
     price: float
     unit: str  # kg, litre, piece
     stock: int
-    image: str  # base64 or URL
+    image: str  # URL; upload files via /admin/products/upload-image
     description: str = ""
     descriptionTE: str = ""
     isAvailable: bool = True
 
+    @field_validator("image")
+    @classmethod
+    def image_must_be_url(cls, value):
+        # Inline base64 images bloat every product document
+        if not value.startswith(("http://", "https://", "/")):
+            raise ValueError("image must be a URL, upload the file via /api/admin/products/upload-image")
+        return value
+
 class CartItem(BaseModel):
     productId: str
     quantity: int
+    # Product details copied in at add time so reading the cart needs no product lookups
+    productName: str = ""
+    productNameTE: str = ""
+    price: float = 0
+    unit: str = ""
+    image: str = ""
 
 class Cart(BaseModel):
     id: Optional[str] = None
@@ -105,12 +157,45 @@ class Order(BaseModel):
 
 # ============ HELPER FUNCTIONS ============
 
+# Fields left out when writing models to MongoDB (the id lives in _id)
+_EXCLUDE_ID = frozenset({"id"})
+
+# Upper bound for list endpoints; use limit/skip to page through more
+MAX_PAGE_SIZE = 1000
+
+# name_lc only backs the prefix search and is never returned
+_PRODUCT_PROJECTION = {"name_lc": 0}
+
+# Product list views don't render descriptions; "thumbnail" mode also drops the image
+_PRODUCT_LIST_PROJECTION = {"description": 0, "descriptionTE": 0, "name_lc": 0}
+_PRODUCT_THUMBNAIL_PROJECTION = {**_PRODUCT_LIST_PROJECTION, "image": 0}
+
+# Product fields copied into cart items and returned as each cart item's
+# "product" (plus its id); update_product and delete_product keep the copies in sync
+_CART_PRODUCT_PROJECTION = {"name": 1, "nameTE": 1, "price": 1, "unit": 1, "image": 1}
+
+def to_object_id(value: str) -> ObjectId:
+    # Reject malformed ids up front instead of failing inside the query
+    if not ObjectId.is_valid(value):
+        raise HTTPException(status_code=400, detail="Invalid id")
+    return ObjectId(value)
+
 def serialize_doc(doc):
     if doc and "_id" in doc:
         doc["id"] = str(doc["_id"])
         del doc["_id"]
     return doc
 
+async def stream_json_array(cursor):
+    # Encode documents one at a time as the cursor yields them instead of
+    # buffering the whole result list before responding
+    first = True
+    yield b"["
+    async for doc in cursor:
+        yield (b"" if first else b",") + orjson.dumps(serialize_doc(doc))
+        first = False
+    yield b"]"
+
 # ============ AUTH APIs ============
 
 @api_router.post("/auth/send-otp")
@@ -134,13 +219,15 @@ async def verify_otp(request: VerifyOTPRequest):
         if not request.name:
             raise HTTPException(status_code=400, detail="Name is required for new users")
         
-        user = User(name=request.name, phone=request.phone)
-        result = await db.users.insert_one(user.dict(exclude={"id"}))
-        user.id = str(result.inserted_id)
-    else:
-        user = User(**serialize_doc(user_doc))
+        user_doc = User(name=request.name, phone=request.phone).model_dump(exclude=_EXCLUDE_ID)
+        try:
+            await db.users.insert_one(user_doc)
+        except DuplicateKeyError:
+            # A concurrent first login for this phone created the user first
+            user_doc = await db.users.find_one({"phone": request.phone})
     
-    return {"success": True, "user": user.dict(), "token": f"token_{user.id}"}
+    user = serialize_doc(user_doc)
+    return {"success": True, "user": user, "token": f"token_{user['id']}"}
 
 @api_router.post("/auth/guest")
 async def guest_login():
@@ -148,20 +235,25 @@ async def guest_login():
 
 @api_router.post("/auth/admin-login")
 async def admin_login(request: AdminLoginRequest):
-    # For MVP, use simple credentials
-    # In production, use proper password hashing
-    if request.username == "admin" and request.password == "admin123":
+    # Check the username first so bad usernames skip the deliberately slow
+    # bcrypt check, and run bcrypt off the event loop. The username isn't
+    # secret, so a plain comparison is fine (and works for any unicode input).
+    if request.username == "admin" and await asyncio.to_thread(
+        bcrypt.checkpw, request.password.encode(), _ADMIN_PASSWORD_HASH
+    ):
         # Check if admin user exists
         admin_doc = await db.users.find_one({"phone": "admin", "role": "admin"})
         if not admin_doc:
             # Create admin user
-            admin = User(name="Admin", phone="admin", role="admin")
-            result = await db.users.insert_one(admin.dict(exclude={"id"}))
-            admin.id = str(result.inserted_id)
-        else:
-            admin = User(**serialize_doc(admin_doc))
+            admin_doc = User(name="Admin", phone="admin", role="admin").model_dump(exclude=_EXCLUDE_ID)
+            try:
+                await db.users.insert_one(admin_doc)
+            except DuplicateKeyError:
+                # A concurrent login created the admin user first
+                admin_doc = await db.users.find_one({"phone": "admin", "role": "admin"})
         
-        return {"success": True, "user": admin.dict(), "token": f"token_{admin.id}"}
+        admin = serialize_doc(admin_doc)
+        return {"success": True, "user": admin, "token": f"token_{admin['id']}"}
     
     raise HTTPException(status_code=401, detail="Invalid credentials")
 
@@ -169,68 +261,165 @@ async def admin_login(request: AdminLoginRequest):
 
 @api_router.get("/categories")
 async def get_categories():
-    categories = await db.categories.find({"isActive": True}).to_list(100)
-    return [serialize_doc(cat) for cat in categories]
+    async with categories_cache_lock:
+        categories = categories_cache.get(True)
+        if categories is None:
+            docs = await db.categories.find({"isActive": True}).to_list(100)
+            categories = categories_cache[True] = [serialize_doc(cat) for cat in docs]
+    return categories
+
+async def invalidate_categories():
+    # Clear under the lock so a refill that started before the write can't
+    # store the old list after it
+    async with categories_cache_lock:
+        categories_cache.clear()
 
 @api_router.post("/admin/categories")
 async def create_category(category: Category):
-    result = await db.categories.insert_one(category.dict(exclude={"id"}))
+    result = await db.categories.insert_one(category.model_dump(exclude=_EXCLUDE_ID))
     category.id = str(result.inserted_id)
+    await invalidate_categories()
     return category
 
 @api_router.put("/admin/categories/{category_id}")
 async def update_category(category_id: str, category: Category):
     await db.categories.update_one(
-        {"_id": ObjectId(category_id)},
-        {"$set": category.dict(exclude={"id"})}
+        {"_id": to_object_id(category_id)},
+        {"$set": category.model_dump(exclude=_EXCLUDE_ID)}
     )
+    await invalidate_categories()
     return {"success": True}
 
 @api_router.delete("/admin/categories/{category_id}")
 async def delete_category(category_id: str):
-    await db.categories.delete_one({"_id": ObjectId(category_id)})
+    await db.categories.delete_one({"_id": to_object_id(category_id)})
+    await invalidate_categories()
     return {"success": True}
 
 # ============ PRODUCT APIs ============
 
 @api_router.get("/products")
-async def get_products(categoryId: Optional[str] = None, search: Optional[str] = None):
+async def get_products(
+    categoryId: Optional[str] = None,
+    search: Optional[str] = None,
+    fields: Optional[str] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    skip: int = Query(0, ge=0)
+):
     query = {"isAvailable": True}
+    projection = _PRODUCT_THUMBNAIL_PROJECTION if fields == "thumbnail" else _PRODUCT_LIST_PROJECTION
     if categoryId:
         query["categoryId"] = categoryId
     if search:
-        query["$or"] = [
-            {"name": {"$regex": search, "$options": "i"}},
-            {"nameTE": {"$regex": search, "$options": "i"}}
-        ]
+        # Prefix search by default: an anchored regex on the lowercased name
+        # (and on nameTE, which has no case) is served as an index range scan.
+        # Each field is queried separately so both lookups get tight index
+        # bounds, then the results are merged by _id. The requested page of
+        # the merged list lies within the first skip + limit of each lookup.
+        by_name, by_name_te = await asyncio.gather(
+            db.products.find({**query, "name_lc": {"$regex": f"^{re.escape(search.lower())}"}}, projection)
+                .sort("_id", 1).to_list(skip + limit),
+            db.products.find({**query, "nameTE": {"$regex": f"^{re.escape(search)}"}}, projection)
+                .sort("_id", 1).to_list(skip + limit),
+        )
+        merged = {prod["_id"]: prod for prod in by_name + by_name_te}
+        if merged:
+            page = sorted(merged.values(), key=lambda prod: prod["_id"])[skip:skip + limit]
+            return [serialize_doc(prod) for prod in page]
+        
+        # Fall back to the text index for words later in the name
+        cursor = db.products.find({**query, "$text": {"$search": search}}, projection).sort("_id", 1).skip(skip).limit(limit)
+        return StreamingResponse(stream_json_array(cursor), media_type="application/json")
     
-    products = await db.products.find(query).to_list(1000)
-    return [serialize_doc(prod) for prod in products]
+    # Sorted on _id so skip/limit pages are stable
+    cursor = db.products.find(query, projection).sort("_id", 1).skip(skip).limit(limit)
+    return StreamingResponse(stream_json_array(cursor), media_type="application/json")
 
 @api_router.get("/products/{product_id}")
 async def get_product(product_id: str):
-    product = await db.products.find_one({"_id": ObjectId(product_id)})
+    product = await db.products.find_one({"_id": to_object_id(product_id)}, _PRODUCT_PROJECTION)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     return serialize_doc(product)
 
+@api_router.post("/admin/products/upload-image")
+async def upload_product_image(file: UploadFile = File(...)):
+    if file.content_type not in ALLOWED_IMAGE_TYPES:
+        raise HTTPException(status_code=400, detail="File must be a PNG, JPEG, WebP or GIF image")
+    
+    grid_in = product_images.open_upload_stream(
+        file.filename or "image",
+        chunk_size_bytes=IMAGE_CHUNK_SIZE,
+        metadata={"contentType": file.content_type}
+    )
+    size = 0
+    while chunk := await file.read(IMAGE_CHUNK_SIZE):
+        size += len(chunk)
+        if size > MAX_IMAGE_BYTES:
+            await grid_in.abort()
+            raise HTTPException(status_code=413, detail="Image is too large")
+        await grid_in.write(chunk)
+    await grid_in.close()
+    
+    return {"success": True, "url": f"/api/products/images/{grid_in._id}"}
+
+@api_router.get("/products/images/{image_id}")
+async def get_product_image(image_id: str):
+    try:
+        grid_out = await product_images.open_download_stream(to_object_id(image_id))
+    except NoFile:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    async def read_chunks():
+        while chunk := await grid_out.readchunk():
+            yield chunk
+    
+    content_type = (grid_out.metadata or {}).get("contentType")
+    return StreamingResponse(
+        read_chunks(),
+        media_type=content_type if content_type in ALLOWED_IMAGE_TYPES else "application/octet-stream",
+        headers={
+            "Cache-Control": "public, max-age=31536000, immutable",
+            "X-Content-Type-Options": "nosniff"
+        }
+    )
+
 @api_router.post("/admin/products")
 async def create_product(product: Product):
-    result = await db.products.insert_one(product.dict(exclude={"id"}))
+    product_doc = product.model_dump(exclude=_EXCLUDE_ID)
+    product_doc["name_lc"] = product.name.lower()
+    result = await db.products.insert_one(product_doc)
     product.id = str(result.inserted_id)
     return product
 
 @api_router.put("/admin/products/{product_id}")
 async def update_product(product_id: str, product: Product):
     await db.products.update_one(
-        {"_id": ObjectId(product_id)},
-        {"$set": product.dict(exclude={"id"})}
+        {"_id": to_object_id(product_id)},
+        {"$set": {**product.model_dump(exclude=_EXCLUDE_ID), "name_lc": product.name.lower()}}
+    )
+    # Refresh the copies embedded in carts
+    await db.carts.update_many(
+        {"items.productId": product_id},
+        {"$set": {
+            "items.$[item].productName": product.name,
+            "items.$[item].productNameTE": product.nameTE,
+            "items.$[item].price": product.price,
+            "items.$[item].unit": product.unit,
+            "items.$[item].image": product.image
+        }},
+        array_filters=[{"item.productId": product_id}]
     )
     return {"success": True}
 
 @api_router.delete("/admin/products/{product_id}")
 async def delete_product(product_id: str):
-    await db.products.delete_one({"_id": ObjectId(product_id)})
+    await db.products.delete_one({"_id": to_object_id(product_id)})
+    # Carts no longer look products up, so drop the deleted product from them
+    await db.carts.update_many(
+        {"items.productId": product_id},
+        {"$pull": {"items": {"productId": product_id}}}
+    )
     return {"success": True}
 
 # ============ CART APIs ============
@@ -241,13 +430,34 @@ async def get_cart(user_id: str):
     if not cart:
         return {"items": []}
     
-    # Get product details for each item
+    items = cart.get("items", [])
+    
+    # Items added before product details were embedded still need a lookup
+    legacy_ids = [
+        ObjectId(item["productId"]) for item in items
+        if "productName" not in item and ObjectId.is_valid(item["productId"])
+    ]
+    by_id = {}
+    if legacy_ids:
+        products = await db.products.find({"_id": {"$in": legacy_ids}}, _CART_PRODUCT_PROJECTION).to_list(len(legacy_ids))
+        by_id = {str(prod["_id"]): serialize_doc(prod) for prod in products}
+    
     items_with_details = []
-    for item in cart.get("items", []):
-        product = await db.products.find_one({"_id": ObjectId(item["productId"])})
+    for item in items:
+        if "productName" in item:
+            product = {
+                "id": item["productId"],
+                "name": item["productName"],
+                "nameTE": item["productNameTE"],
+                "price": item["price"],
+                "unit": item["unit"],
+                "image": item["image"]
+            }
+        else:
+            product = by_id.get(item["productId"])
         if product:
             items_with_details.append({
-                "product": serialize_doc(product),
+                "product": product,
                 "quantity": item["quantity"]
             })
     
@@ -255,65 +465,70 @@ async def get_cart(user_id: str):
 
 @api_router.post("/cart/add")
 async def add_to_cart(user_id: str, product_id: str, quantity: int = 1):
-    cart = await db.carts.find_one({"userId": user_id})
+    # Bump the quantity if the product is already in the cart
+    result = await db.carts.update_one(
+        {"userId": user_id, "items.productId": product_id},
+        {"$inc": {"items.$.quantity": quantity}}
+    )
     
-    if not cart:
-        # Create new cart
-        cart = {"userId": user_id, "items": [{"productId": product_id, "quantity": quantity}]}
-        await db.carts.insert_one(cart)
-    else:
-        # Update existing cart
-        items = cart.get("items", [])
-        found = False
-        for item in items:
-            if item["productId"] == product_id:
-                item["quantity"] += quantity
-                found = True
-                break
-        
-        if not found:
-            items.append({"productId": product_id, "quantity": quantity})
+    if result.matched_count == 0:
+        product = await db.products.find_one({"_id": to_object_id(product_id)}, _CART_PRODUCT_PROJECTION)
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
         
-        await db.carts.update_one(
-            {"userId": user_id},
-            {"$set": {"items": items}}
+        item = CartItem(
+            productId=product_id,
+            quantity=quantity,
+            productName=product["name"],
+            productNameTE=product["nameTE"],
+            price=product["price"],
+            unit=product["unit"],
+            image=product["image"]
         )
+        
+        # Append the item unless a concurrent add already did, creating the
+        # cart if needed
+        try:
+            await db.carts.update_one(
+                {"userId": user_id, "items.productId": {"$ne": product_id}},
+                {"$push": {"items": item.model_dump()}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # The cart already holds the product, so the filter missed and the
+            # upsert collided with the unique userId index; add to that line
+            await db.carts.update_one(
+                {"userId": user_id, "items.productId": product_id},
+                {"$inc": {"items.$.quantity": quantity}}
+            )
     
     return {"success": True}
 
 @api_router.put("/cart/update")
 async def update_cart_item(user_id: str, product_id: str, quantity: int):
-    cart = await db.carts.find_one({"userId": user_id})
-    if not cart:
-        raise HTTPException(status_code=404, detail="Cart not found")
-    
-    items = cart.get("items", [])
-    for item in items:
-        if item["productId"] == product_id:
-            if quantity <= 0:
-                items.remove(item)
-            else:
-                item["quantity"] = quantity
-            break
+    if quantity <= 0:
+        result = await db.carts.update_one(
+            {"userId": user_id},
+            {"$pull": {"items": {"productId": product_id}}}
+        )
+        if result.matched_count == 0:
+            raise HTTPException(status_code=404, detail="Cart not found")
+        return {"success": True}
     
-    await db.carts.update_one(
-        {"userId": user_id},
-        {"$set": {"items": items}}
+    result = await db.carts.update_one(
+        {"userId": user_id, "items.productId": product_id},
+        {"$set": {"items.$.quantity": quantity}}
     )
+    if result.matched_count == 0 and not await db.carts.count_documents({"userId": user_id}, limit=1):
+        raise HTTPException(status_code=404, detail="Cart not found")
     
     return {"success": True}
 
 @api_router.delete("/cart/remove/{user_id}/{product_id}")
 async def remove_from_cart(user_id: str, product_id: str):
-    cart = await db.carts.find_one({"userId": user_id})
-    if not cart:
-        return {"success": True}
-    
-    items = [item for item in cart.get("items", []) if item["productId"] != product_id]
-    
     await db.carts.update_one(
         {"userId": user_id},
-        {"$set": {"items": items}}
+        {"$pull": {"items": {"productId": product_id}}}
     )
     
     return {"success": True}
@@ -327,10 +542,13 @@ async def clear_cart(user_id: str):
 
 @api_router.post("/orders")
 async def create_order(order: Order):
-    result = await db.orders.insert_one(order.dict(exclude={"id"}))
-    order.id = str(result.inserted_id)
+    order_doc = order.model_dump(exclude=_EXCLUDE_ID)
+    order_doc["_id"] = ObjectId()
+    order.id = str(order_doc["_id"])
+    
+    await db.orders.insert_one(order_doc)
     
-    # Clear cart if user is logged in
+    # Clear cart if user is logged in, only once the order is stored
     if order.userId:
         await db.carts.delete_one({"userId": order.userId})
     
@@ -343,24 +561,29 @@ async def get_my_orders(user_id: str):
 
 @api_router.get("/orders/{order_id}")
 async def get_order(order_id: str):
-    order = await db.orders.find_one({"_id": ObjectId(order_id)})
+    order = await db.orders.find_one({"_id": to_object_id(order_id)})
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return serialize_doc(order)
 
 @api_router.get("/admin/orders")
-async def get_all_orders(status: Optional[str] = None):
+async def get_all_orders(
+    status: Optional[str] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    skip: int = Query(0, ge=0)
+):
     query = {}
     if status:
         query["status"] = status
     
-    orders = await db.orders.find(query).sort("createdAt", -1).to_list(1000)
-    return [serialize_doc(order) for order in orders]
+    # _id breaks ties between orders with the same createdAt so pages are stable
+    cursor = db.orders.find(query).sort([("createdAt", -1), ("_id", -1)]).skip(skip).limit(limit)
+    return StreamingResponse(stream_json_array(cursor), media_type="application/json")
 
 @api_router.put("/admin/orders/{order_id}/status")
 async def update_order_status(order_id: str, status: str):
     await db.orders.update_one(
-        {"_id": ObjectId(order_id)},
+        {"_id": to_object_id(order_id)},
         {"$set": {"status": status, "updatedAt": datetime.utcnow()}}
     )
     return {"success": True}
@@ -369,7 +592,7 @@ async def update_order_status(order_id: str, status: str):
 
 @api_router.get("/users/{user_id}")
 async def get_user(user_id: str):
-    user = await db.users.find_one({"_id": ObjectId(user_id)})
+    user = await db.users.find_one({"_id": to_object_id(user_id)})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return serialize_doc(user)
@@ -377,24 +600,31 @@ async def get_user(user_id: str):
 @api_router.put("/users/{user_id}")
 async def update_user(user_id: str, user: User):
     await db.users.update_one(
-        {"_id": ObjectId(user_id)},
-        {"$set": user.dict(exclude={"id"})}
+        {"_id": to_object_id(user_id)},
+        {"$set": user.model_dump(exclude=_EXCLUDE_ID)}
     )
     return {"success": True}
 
 @api_router.post("/users/{user_id}/address")
 async def add_address(user_id: str, address: Address):
-    user = await db.users.find_one({"_id": ObjectId(user_id)})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    new_address = address.model_dump()
     
-    addresses = user.get("addresses", [])
-    addresses.append(address.dict())
+    if address.isDefault:
+        # Clear the default flag on existing addresses and append in one update
+        update = [{"$set": {"addresses": {"$concatArrays": [
+            {"$map": {
+                "input": {"$ifNull": ["$addresses", []]},
+                "as": "addr",
+                "in": {"$mergeObjects": ["$$addr", {"isDefault": False}]}
+            }},
+            [{"$literal": new_address}]
+        ]}}}]
+    else:
+        update = {"$push": {"addresses": new_address}}
     
-    await db.users.update_one(
-        {"_id": ObjectId(user_id)},
-        {"$set": {"addresses": addresses}}
-    )
+    result = await db.users.update_one({"_id": to_object_id(user_id)}, update)
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="User not found")
     
     return {"success": True}
 
@@ -402,23 +632,40 @@ async def add_address(user_id: str, address: Address):
 
 @api_router.get("/admin/analytics/dashboard")
 async def get_dashboard_stats():
-    # Get today's orders
     today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_orders = await db.orders.count_documents({"createdAt": {"$gte": today}})
-    
-    # Get pending orders
-    pending_orders = await db.orders.count_documents({"status": "pending"})
+    # Order ids embed their creation time, so "today" is a range on the _id index
+    today_oid = ObjectId.from_datetime(today)
     
-    # Get today's revenue
+    # Today's orders, pending orders and today's revenue in a single pass.
+    # $facet can't use indexes, so the leading $match (an index union of the
+    # _id range and status) is the only stage that filters on the indexed
+    # fields; the facets split its output on the isToday flag it sets.
     pipeline = [
-        {"$match": {"createdAt": {"$gte": today}, "status": {"$ne": "cancelled"}}},
-        {"$group": {"_id": None, "total": {"$sum": "$totalAmount"}}}
+        {"$match": {"$or": [{"_id": {"$gte": today_oid}}, {"status": "pending"}]}},
+        {"$addFields": {"isToday": {"$gte": ["$_id", today_oid]}}},
+        {"$facet": {
+            "today": [
+                {"$match": {"isToday": True}},
+                {"$count": "n"}
+            ],
+            "pending": [
+                {"$match": {"status": "pending"}},
+                {"$count": "n"}
+            ],
+            "revenue": [
+                {"$match": {"isToday": True, "status": {"$ne": "cancelled"}}},
+                {"$group": {"_id": None, "total": {"$sum": "$totalAmount"}}}
+            ]
+        }}
     ]
-    revenue_result = await db.orders.aggregate(pipeline).to_list(1)
-    today_revenue = revenue_result[0]["total"] if revenue_result else 0
-    
-    # Get total customers
-    total_customers = await db.users.count_documents({"role": "customer"})
+    orders_result, total_customers = await asyncio.gather(
+        db.orders.aggregate(pipeline).to_list(1),
+        db.users.count_documents({"role": "customer"})
+    )
+    facets = orders_result[0]
+    today_orders = facets["today"][0]["n"] if facets["today"] else 0
+    pending_orders = facets["pending"][0]["n"] if facets["pending"] else 0
+    today_revenue = facets["revenue"][0]["total"] if facets["revenue"] else 0
     
     return {
         "todayOrders": today_orders,
@@ -446,8 +693,11 @@ async def seed_data():
         {"name": "Vegetables", "nameTE": "కూరగాయలు", "icon": "🥬", "isActive": True},
     ]
     
-    category_results = await db.categories.insert_many(categories)
-    category_ids = [str(id) for id in category_results.inserted_ids]
+    # Assign category ids up front so products can reference them and both
+    # collections can be inserted concurrently
+    for cat in categories:
+        cat["_id"] = ObjectId()
+    category_ids = [str(cat["_id"]) for cat in categories]
     
     # Seed products
     products = [
@@ -476,7 +726,13 @@ async def seed_data():
         {"name": "Onion", "nameTE": "ఉల్లిపాయ", "categoryId": category_ids[5], "price": 35, "unit": "kg", "stock": 60, "image": "https://via.placeholder.com/200?text=Onion", "isAvailable": True},
     ]
     
-    await db.products.insert_many(products)
+    for prod in products:
+        prod["name_lc"] = prod["name"].lower()
+    
+    await asyncio.gather(
+        db.categories.insert_many(categories, ordered=False),
+        db.products.insert_many(products, ordered=False)
+    )
     
     return {"success": True, "message": "Data seeded successfully"}
 
@@ -489,21 +745,114 @@ async def root():
 # Include router
 app.include_router(api_router)
 
+# Explicit origins, methods and headers let browsers cache preflights
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=os.environ.get('CORS_ORIGINS', 'https://quick-kirana-6.preview.emergentagent.com').split(','),
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
+    allow_headers=["Authorization", "Content-Type"],
+    max_age=86400,
 )
 
-# Configure logging
+# Configure logging. Request handlers only enqueue records; formatting and
+# writing happen on the listener's background thread.
+log_queue = queue.Queue(-1)
+log_handler = logging.StreamHandler()
+log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+log_listener = QueueListener(log_queue, log_handler, respect_handler_level=True)
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    handlers=[QueueHandler(log_queue)]
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def start_log_listener():
+    log_listener.start()
+
+@app.on_event("startup")
+async def warm_up_db_client():
+    # Open pooled connections before the first request arrives
+    await db.command("ping")
+
+async def merge_duplicate_carts():
+    # Carts written before the unique userId index may be split across
+    # documents; fold each user's extra carts into their oldest one
+    pipeline = [
+        {"$group": {"_id": "$userId", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ]
+    async for duplicate in db.carts.aggregate(pipeline):
+        carts = await db.carts.find({"_id": {"$in": duplicate["ids"]}}).sort("_id", 1).to_list(None)
+        items = {}
+        for cart in carts:
+            for item in cart.get("items", []):
+                if item["productId"] in items:
+                    items[item["productId"]]["quantity"] += item["quantity"]
+                else:
+                    items[item["productId"]] = item
+        await db.carts.update_one({"_id": carts[0]["_id"]}, {"$set": {"items": list(items.values())}})
+        await db.carts.delete_many({"_id": {"$in": [cart["_id"] for cart in carts[1:]]}})
+
+async def has_duplicates(collection, field):
+    pipeline = [
+        {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": 1}
+    ]
+    return bool(await collection.aggregate(pipeline).to_list(1))
+
+async def create_unique_index(collection, field):
+    # Existing duplicates would fail the build and stop the app from
+    # starting, so fall back to a plain index and leave them for cleanup.
+    # The plain index has the same default name, so once the duplicates are
+    # gone it's dropped and rebuilt as unique. Returns whether the index is unique.
+    name = f"{field}_1"
+    if not await has_duplicates(collection, field):
+        existing = (await collection.index_information()).get(name)
+        if existing and not existing.get("unique"):
+            await collection.drop_index(name)
+        try:
+            await collection.create_index(field, unique=True, background=True)
+            return True
+        except DuplicateKeyError:
+            pass  # duplicates written since the check
+    logger.warning("Duplicate %s.%s values found, using a non-unique index until they're removed", collection.name, field)
+    await collection.create_index(field, background=True)
+    return False
+
+@app.on_event("startup")
+async def ensure_indexes():
+    await merge_duplicate_carts()
+    await create_unique_index(db.users, "phone")
+    if not await create_unique_index(db.carts, "userId"):
+        # add_to_cart relies on the unique index to catch a racing first add
+        logger.warning("carts.userId isn't unique: concurrent first adds can create a second cart for a user")
+    await db.orders.create_index("userId", background=True)
+    await db.orders.create_index([("createdAt", -1)], background=True)
+    await db.orders.create_index("status", background=True)
+    await db.products.create_index("categoryId", background=True)
+    await db.products.create_index("isAvailable", background=True)
+    await db.products.create_index("name_lc", background=True)
+    await db.products.create_index("nameTE", background=True)
+    await db.products.create_index(
+        [("name", "text"), ("nameTE", "text")], default_language="none", background=True
+    )
+    await db.categories.create_index("isActive", background=True)
+
+@app.on_event("startup")
+async def backfill_product_name_lc():
+    # Products written before name_lc existed can't be found by prefix search
+    await db.products.update_many(
+        {"name_lc": {"$exists": False}},
+        [{"$set": {"name_lc": {"$toLower": "$name"}}}]
+    )
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
+
+@app.on_event("shutdown")
+async def stop_log_listener():
+    log_listener.stop()
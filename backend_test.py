@@ -4,203 +4,628 @@ Kirana Shop Backend API Testing Script
 Tests all backend APIs as specified in the review request
 """
 
-import requests
+import argparse
+import asyncio
+import base64
+import contextlib
+import contextvars
+import csv
+import functools
+import httpx
+from faker import Faker
+import ijson
 import json
+import orjson
+import os
+import pathlib
+import random
+import statistics
 import sys
+import time
+import types
+from collections import Counter, defaultdict
 from datetime import datetime
+from openapi_smoke import fetch_schema, get_requests
 
 # Backend URL from frontend .env
 BASE_URL = "https://quick-kirana-6.preview.emergentagent.com/api"
 
+# KIRANA_INPROCESS=1 calls backend/server.py's app directly instead of the
+# deployed URL; the backend's MONGO_URL and DB_NAME must be set
+INPROCESS = os.environ.get("KIRANA_INPROCESS") == "1"
+INPROCESS_BASE_URL = "http://test/api"
+
+# Number of distinct guest order payloads generated up front
+ORDER_PAYLOAD_POOL_SIZE = 32
+
+# Largest limit the list endpoints accept (MAX_PAGE_SIZE in backend/server.py)
+# and the page size the paging checks use
+MAX_PAGE_SIZE = 1000
+PAGING_PAGE_SIZE = 5
+
+# 1x1 transparent PNG for the image upload round trip
+TEST_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000b49444154789c6360000200000500017a5eab3f0000000049454e44ae426082"
+)
+
+# Where --load writes its per-endpoint latency stats
+LOAD_CSV = "load_test_stats.csv"
+
+# Failed suites and suite durations from the last run, read by --rerun-failed
+RESULTS_CACHE = pathlib.Path(".kirana_test_cache.json")
+
+# Ids collected by the last run; reused (unless --fresh) so auth doesn't
+# have to run again while the stored user exists, nor seed while the stored
+# product does
+STATE_FILE = pathlib.Path(".kirana_test_state.json")
+STATE_KEYS = ("user_id", "admin_token", "guest_id", "category_id", "product_id", "order_id")
+STATE_SUITES = ["seed", "auth"]
+
+# Suite name -> test method, in run order
+SUITES = {
+    "seed": "test_seed_data",
+    "auth": "test_auth_apis",
+    "category": "test_category_apis",
+    "product": "test_product_apis",
+    "cart": "test_cart_apis",
+    "order": "test_order_apis",
+    "admin": "test_admin_apis",
+    "openapi": "test_openapi_endpoints",
+}
+
+# Suites whose ids (or seeded data) a suite needs; selecting a suite also
+# runs these first
+SUITE_DEPENDENCIES = {
+    "category": ["seed"],
+    "product": ["category"],
+    "cart": ["auth", "product"],
+    "order": ["auth", "product"],
+    "admin": ["order"],
+    "openapi": ["order"],
+}
+
+# Suites within a phase have no data dependency on each other and run
+# concurrently; each phase waits for the previous one to finish
+PHASES = [
+    ["seed"],
+    ["auth", "category"],
+    ["product"],  # needs category_id
+    ["cart"],     # needs user_id and product_id
+    ["order"],    # clears the cart, so runs after it
+    ["admin", "openapi"],  # need order_id
+]
+
+# Suite the currently running check belongs to
+current_suite = contextvars.ContextVar("current_suite", default=None)
+
+def resolve_suites(only=None, skip=(), provided=()):
+    """Selected suites (all by default) plus their dependencies, minus skipped
+    ones. Suites in provided are treated as already satisfied: they only run
+    if named in only."""
+    selected = set()
+    pending = list(only or (name for name in SUITES if name not in provided))
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(dep for dep in SUITE_DEPENDENCIES.get(name, []) if dep not in provided)
+    return selected - set(skip)
+
+class StatusRetryTransport(httpx.AsyncBaseTransport):
+    """Retry idempotent requests that get a 502/503/504 with exponential
+    backoff, as the requests adapter's Retry(status_forcelist=...) did;
+    httpx's own retries only cover failed connection attempts"""
+    RETRY_STATUSES = frozenset({502, 503, 504})
+    IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+    
+    def __init__(self, transport, retries=2, backoff=0.1):
+        self.transport = transport
+        self.retries = retries
+        self.backoff = backoff
+    
+    async def handle_async_request(self, request):
+        attempt = 0
+        while True:
+            response = await self.transport.handle_async_request(request)
+            if (response.status_code not in self.RETRY_STATUSES
+                    or request.method not in self.IDEMPOTENT_METHODS
+                    or attempt == self.retries):
+                return response
+            await response.aclose()
+            await asyncio.sleep(self.backoff * 2 ** attempt)
+            attempt += 1
+    
+    async def aclose(self):
+        await self.transport.aclose()
+
+def make_client(base_url, app=None):
+    """HTTP/2 client that multiplexes concurrent requests over one connection,
+    or an in-process ASGI client when an app is given"""
+    if app is not None:
+        transport = httpx.ASGITransport(app=app)
+    else:
+        transport = StatusRetryTransport(httpx.AsyncHTTPTransport(
+            http2=True,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+            retries=2
+        ))
+    return httpx.AsyncClient(base_url=base_url, transport=transport, timeout=30.0)
+
+def latency_percentiles(samples):
+    """p50/p95/p99 of a list of latencies"""
+    if len(samples) < 2:
+        return {"p50": samples[0], "p95": samples[0], "p99": samples[0]}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+# Endpoint paths, relative to the client's base_url; parameterised ones are
+# bound str.format methods
+URLS = types.SimpleNamespace(
+    seed_data="/admin/seed-data",
+    send_otp="/auth/send-otp",
+    verify_otp="/auth/verify-otp",
+    admin_login="/auth/admin-login",
+    guest_login="/auth/guest",
+    categories="/categories",
+    products="/products",
+    product="/products/{}".format,
+    cart_add="/cart/add",
+    cart="/cart/{}".format,
+    cart_update="/cart/update",
+    cart_remove="/cart/remove/{}/{}".format,
+    orders="/orders",
+    my_orders="/orders/my/{}".format,
+    user="/users/{}".format,
+    order="/orders/{}".format,
+    admin_orders="/admin/orders",
+    order_status="/admin/orders/{}/status".format,
+    dashboard="/admin/analytics/dashboard",
+    admin_products="/admin/products",
+    upload_image="/admin/products/upload-image",
+)
+
+# ============ REQUEST BUILDERS ============
+# Shared by the functional checks and the load test; paths are relative to
+# the client's base_url
+
+async def status_only(client, method, path):
+    """Send a request whose body is only read if the status isn't 2xx,
+    for checks that only look at the status code"""
+    async with client.stream(method, path) as response:
+        if not response.is_success:
+            await response.aread()
+        return response
+
+async def post_json(client, path, payload):
+    """POST a JSON body encoded with orjson, which writes UTF-8 directly
+    instead of escaping the Telugu strings; bytes are sent as they are"""
+    return await client.post(
+        path,
+        content=payload if isinstance(payload, bytes) else orjson.dumps(payload),
+        headers={"Content-Type": "application/json"}
+    )
+
+async def summarize_items(response):
+    """Count the items of a streamed JSON array and keep the first one. The
+    body is fed to ijson chunk by chunk, so the whole list is never built;
+    count is None if the body isn't an array."""
+    events = ijson.sendable_list()
+    parser = ijson.items_coro(events, "item")
+    count, first, is_list = 0, None, None
+    async for chunk in response.aiter_bytes():
+        if is_list is None and chunk.strip():
+            is_list = chunk.lstrip()[:1] == b"["
+        parser.send(chunk)
+        if events:
+            if first is None:
+                first = events[0]
+            count += len(events)
+            del events[:]
+    parser.close()
+    if events and first is None:
+        first = events[0]
+    count += len(events)
+    return {"count": count if is_list else None, "first": first}
+
+async def drain(request):
+    """Await a streamed response, read its body to the end chunk by chunk
+    without keeping it, and close it"""
+    response = await request
+    try:
+        async for _ in response.aiter_raw():
+            pass
+    finally:
+        await response.aclose()
+    return response
+
+async def seed_data(client):
+    return await status_only(client, "POST", URLS.seed_data)
+
+async def send_otp(client, phone):
+    return await post_json(client, URLS.send_otp, {"phone": phone})
+
+async def verify_otp(client, phone, otp, name):
+    return await post_json(client, URLS.verify_otp, {"phone": phone, "otp": otp, "name": name})
+
+async def admin_login(client, username, password):
+    return await post_json(client, URLS.admin_login, {"username": username, "password": password})
+
+async def guest_login(client):
+    return await client.post(URLS.guest_login)
+
+async def get_categories(client):
+    return await client.get(URLS.categories)
+
+async def get_products(client, category_id=None, stream=False, **params):
+    """params are extra query parameters (limit, skip, fields, search)"""
+    if category_id:
+        params["categoryId"] = category_id
+    request = client.build_request("GET", URLS.products, params=params or None)
+    return await client.send(request, stream=stream)
+
+async def get_product(client, product_id):
+    return await client.get(URLS.product(product_id))
+
+async def add_to_cart(client, user_id, product_id, quantity):
+    return await client.post(URLS.cart_add, params={"user_id": user_id, "product_id": product_id, "quantity": quantity})
+
+async def get_cart(client, user_id):
+    return await client.get(URLS.cart(user_id))
+
+async def update_cart_item(client, user_id, product_id, quantity):
+    return await client.put(URLS.cart_update, params={"user_id": user_id, "product_id": product_id, "quantity": quantity})
+
+async def remove_from_cart(client, user_id, product_id):
+    return await client.delete(URLS.cart_remove(user_id, product_id))
+
+async def create_order(client, order):
+    return await post_json(client, URLS.orders, order)
+
+async def get_user(client, user_id):
+    return await client.get(URLS.user(user_id))
+
+async def get_my_orders(client, user_id):
+    return await client.get(URLS.my_orders(user_id))
+
+async def get_order(client, order_id):
+    return await client.get(URLS.order(order_id))
+
+async def get_all_orders(client, status=None, stream=False, **params):
+    """params are extra query parameters (limit, skip)"""
+    if status:
+        params["status"] = status
+    request = client.build_request("GET", URLS.admin_orders, params=params or None)
+    return await client.send(request, stream=stream)
+
+async def update_order_status(client, order_id, status):
+    return await client.put(URLS.order_status(order_id), params={"status": status})
+
+async def get_dashboard(client):
+    return await client.get(URLS.dashboard)
+
+async def create_product(client, product):
+    return await post_json(client, URLS.admin_products, product)
+
+async def upload_product_image(client, filename, content, content_type):
+    return await client.post(URLS.upload_image, files={"file": (filename, content, content_type)})
+
+async def get_product_image(client, url):
+    # Upload responses give an absolute path (/api/products/images/...)
+    return await client.get(client.base_url.join(url))
+
+async def read_image(response):
+    """Body, content type and nosniff header of an image response"""
+    await response.aread()
+    return {
+        "content": response.content,
+        "contentType": response.headers.get("content-type"),
+        "nosniff": response.headers.get("x-content-type-options") == "nosniff"
+    }
+
+def api_test(name, validate, parse=True, statuses=(200,)):
+    """Decorate a check that returns the response to test, or None to skip.
+    validate(self, data) gets the parsed body (None if parse is False) and
+    returns (success, message), which is logged under name along with how
+    long the check's request took. parse may also be an async function that
+    reads a streamed response itself, such as summarize_items."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(self):
+            response = None
+            try:
+                start = time.perf_counter_ns()
+                response = await fn(self)
+                duration_ns = time.perf_counter_ns() - start
+                if response is None:
+                    return None
+                if response.status_code not in statuses:
+                    await response.aread()
+                    self.log_test(name, False, f"Status: {response.status_code}", response.text, duration_ns)
+                    return False
+                if callable(parse):
+                    data = await parse(response)
+                    duration_ns = time.perf_counter_ns() - start  # include reading the streamed body
+                else:
+                    data = orjson.loads(response.content) if parse else None
+                success, message = validate(self, data)
+                self.log_test(name, success, message, None if success else data, duration_ns)
+                return success
+            except Exception as e:
+                self.log_test(name, False, f"Exception: {str(e)}")
+                return False
+            finally:
+                if response is not None:
+                    await response.aclose()
+        return wrapper
+    return decorator
+
 class KiranaAPITester:
-    def __init__(self):
-        self.base_url = BASE_URL
-        self.session = requests.Session()
+    # Endpoints exercised by --load: (name, request builder taking the tester
+    # and the virtual user's iteration number)
+    LOAD_TASKS = [
+        ("GET /categories", lambda t, i: get_categories(t.client)),
+        ("GET /products", lambda t, i: drain(get_products(t.client, stream=True))),
+        ("GET /products?categoryId", lambda t, i: drain(get_products(t.client, t.category_id, stream=True))),
+        ("GET /products/{id}", lambda t, i: get_product(t.client, t.product_id)),
+        ("POST /auth/send-otp", lambda t, i: send_otp(t.client, "9999999999")),
+        ("POST /orders (guest)", lambda t, i: create_order(t.client, t._guest_order_payload(i))),
+        ("GET /admin/orders", lambda t, i: drain(get_all_orders(t.client, stream=True))),
+        ("GET /admin/analytics/dashboard", lambda t, i: get_dashboard(t.client)),
+    ]
+    
+    def __init__(self, inprocess=INPROCESS):
+        self.inprocess = inprocess
+        self.base_url = INPROCESS_BASE_URL if inprocess else BASE_URL
+        self.client = None
         self.user_id = None
         self.admin_token = None
         self.guest_id = None
         self.category_id = None
         self.product_id = None
         self.order_id = None
+        self.image_url = None
         self.test_results = []
         
-    def log_test(self, test_name, success, message, response_data=None):
+        # Guest profiles are generated once (seeded, so runs are repeatable);
+        # the order bodies are encoded on first use, once product_id is known
+        fake = Faker("en_IN")
+        fake.seed_instance(0)
+        self._guest_profiles = [
+            {
+                "guestName": fake.name(),
+                "guestPhone": fake.numerify("9#########"),
+                "deliveryAddress": {
+                    "label": "Office",
+                    "address": f"{fake.street_address()}, {fake.city()}",
+                    "landmark": f"Near {fake.company()}"
+                }
+            }
+            for _ in range(ORDER_PAYLOAD_POOL_SIZE)
+        ]
+        self._order_payload_bytes = None
+    
+    def log_test(self, test_name, success, message, response_data=None, duration_ns=None):
         """Log test results"""
         status = "✅ PASS" if success else "❌ FAIL"
         print(f"{status} {test_name}: {message}")
         
         self.test_results.append({
+            "suite": current_suite.get(),
             "test": test_name,
             "success": success,
             "message": message,
-            "response_data": response_data
+            "response_data": response_data,
+            "duration_ns": duration_ns
         })
         
         if not success:
             print(f"   Response: {response_data}")
     
-    def test_seed_data(self):
+    def _guest_order_payload(self, i):
+        """Encoded guest order body from the pre-generated pool"""
+        if self._order_payload_bytes is None:
+            self._order_payload_bytes = [
+                orjson.dumps({
+                    **profile,
+                    "items": [
+                        {
+                            "productId": self.product_id,
+                            "productName": "Test Product",
+                            "productNameTE": "టెస్ట్ ప్రొడక్ట్",
+                            "quantity": 1,
+                            "price": 100.0
+                        }
+                    ],
+                    "totalAmount": 130.0,
+                    "deliveryType": "delivery",
+                    "deliveryCharge": 30.0,
+                    "paymentMethod": "COD"
+                })
+                for profile in self._guest_profiles
+            ]
+        return self._order_payload_bytes[i % len(self._order_payload_bytes)]
+    
+    async def test_seed_data(self):
         """Seed initial data for testing"""
         print("\n🌱 SEEDING DATA...")
-        try:
-            response = self.session.post(f"{self.base_url}/admin/seed-data")
-            if response.status_code in [200, 201]:
-                self.log_test("Seed Data", True, "Data seeded successfully")
-                return True
-            else:
-                self.log_test("Seed Data", False, f"Status: {response.status_code}", response.text)
-                return False
-        except Exception as e:
-            self.log_test("Seed Data", False, f"Exception: {str(e)}")
-            return False
+        return await self._test_seed_data()
     
-    def test_auth_apis(self):
+    @api_test("Seed Data", lambda self, data: (True, "Data seeded successfully"), parse=False, statuses=(200, 201))
+    async def _test_seed_data(self):
+        return await seed_data(self.client)
+    
+    async def test_auth_apis(self):
         """Test all authentication APIs"""
         print("\n🔐 TESTING AUTHENTICATION APIs...")
         
-        # 1. Test send OTP
-        try:
-            payload = {"phone": "9999999999"}
-            response = self.session.post(f"{self.base_url}/auth/send-otp", json=payload)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("success") and data.get("otp") == "1234":
-                    self.log_test("Send OTP", True, "OTP sent successfully")
-                else:
-                    self.log_test("Send OTP", False, "Invalid response format", data)
-            else:
-                self.log_test("Send OTP", False, f"Status: {response.status_code}", response.text)
-        except Exception as e:
-            self.log_test("Send OTP", False, f"Exception: {str(e)}")
-        
-        # 2. Test verify OTP
-        try:
-            payload = {"phone": "9999999999", "otp": "1234", "name": "Ravi Kumar"}
-            response = self.session.post(f"{self.base_url}/auth/verify-otp", json=payload)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("success") and data.get("user"):
-                    self.user_id = data["user"]["id"]
-                    self.log_test("Verify OTP", True, f"User authenticated, ID: {self.user_id}")
-                else:
-                    self.log_test("Verify OTP", False, "Invalid response format", data)
-            else:
-                self.log_test("Verify OTP", False, f"Status: {response.status_code}", response.text)
-        except Exception as e:
-            self.log_test("Verify OTP", False, f"Exception: {str(e)}")
-        
-        # 3. Test admin login
-        try:
-            payload = {"username": "admin", "password": "admin123"}
-            response = self.session.post(f"{self.base_url}/auth/admin-login", json=payload)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("success") and data.get("user"):
-                    self.admin_token = data.get("token")
-                    self.log_test("Admin Login", True, "Admin authenticated successfully")
-                else:
-                    self.log_test("Admin Login", False, "Invalid response format", data)
-            else:
-                self.log_test("Admin Login", False, f"Status: {response.status_code}", response.text)
-        except Exception as e:
-            self.log_test("Admin Login", False, f"Exception: {str(e)}")
-        
-        # 4. Test guest login
-        try:
-            response = self.session.post(f"{self.base_url}/auth/guest")
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("success") and data.get("guestId"):
-                    self.guest_id = data["guestId"]
-                    self.log_test("Guest Login", True, f"Guest ID: {self.guest_id}")
-                else:
-                    self.log_test("Guest Login", False, "Invalid response format", data)
-            else:
-                self.log_test("Guest Login", False, f"Status: {response.status_code}", response.text)
-        except Exception as e:
-            self.log_test("Guest Login", False, f"Exception: {str(e)}")
+        # Verify OTP follows send OTP; admin and guest login are independent
+        await asyncio.gather(
+            self._test_otp_flow(),
+            self._test_admin_login(),
+            self._test_admin_login_non_ascii(),
+            self._test_guest_login()
+        )
+    
+    async def _test_otp_flow(self):
+        await self._test_send_otp()
+        await self._test_verify_otp()
+    
+    @api_test("Send OTP", lambda self, data: (
+        (True, "OTP sent successfully") if data.get("success") and data.get("otp") == "1234"
+        else (False, "Invalid response format")
+    ))
+    async def _test_send_otp(self):
+        return await send_otp(self.client, "9999999999")
+    
+    def _check_verified_user(self, data):
+        if data.get("success") and data.get("user"):
+            self.user_id = data["user"]["id"]
+            return True, f"User authenticated, ID: {self.user_id}"
+        return False, "Invalid response format"
+    
+    @api_test("Verify OTP", _check_verified_user)
+    async def _test_verify_otp(self):
+        return await verify_otp(self.client, "9999999999", "1234", "Ravi Kumar")
+    
+    def _check_admin(self, data):
+        if data.get("success") and data.get("user"):
+            self.admin_token = data.get("token")
+            return True, "Admin authenticated successfully"
+        return False, "Invalid response format"
+    
+    @api_test("Admin Login", _check_admin)
+    async def _test_admin_login(self):
+        return await admin_login(self.client, "admin", "admin123")
+    
+    @api_test("Admin Login (Non-ASCII Username)", lambda self, data: (True, "Rejected with 401"), parse=False, statuses=(401,))
+    async def _test_admin_login_non_ascii(self):
+        return await admin_login(self.client, "ädmin", "admin123")
+    
+    def _check_guest(self, data):
+        if data.get("success") and data.get("guestId"):
+            self.guest_id = data["guestId"]
+            return True, f"Guest ID: {self.guest_id}"
+        return False, "Invalid response format"
     
-    def test_category_apis(self):
+    @api_test("Guest Login", _check_guest)
+    async def _test_guest_login(self):
+        return await guest_login(self.client)
+    
+    async def test_category_apis(self):
         """Test category APIs"""
         print("\n📂 TESTING CATEGORY APIs...")
-        
-        try:
-            response = self.session.get(f"{self.base_url}/categories")
-            
-            if response.status_code == 200:
-                data = response.json()
-                if isinstance(data, list) and len(data) >= 6:
-                    # Check for Telugu names
-                    has_telugu = any("nameTE" in cat for cat in data)
-                    if has_telugu:
-                        self.category_id = data[0]["id"]  # Store first category ID
-                        self.log_test("Get Categories", True, f"Found {len(data)} categories with Telugu names")
-                    else:
-                        self.log_test("Get Categories", False, "Categories missing Telugu names", data)
-                else:
-                    self.log_test("Get Categories", False, f"Expected 6+ categories, got {len(data) if isinstance(data, list) else 'invalid'}", data)
-            else:
-                self.log_test("Get Categories", False, f"Status: {response.status_code}", response.text)
-        except Exception as e:
-            self.log_test("Get Categories", False, f"Exception: {str(e)}")
+        await self._test_get_categories()
+    
+    def _check_categories(self, data):
+        if not (isinstance(data, list) and len(data) >= 6):
+            return False, f"Expected 6+ categories, got {len(data) if isinstance(data, list) else 'invalid'}"
+        # Check for Telugu names
+        if not any("nameTE" in cat for cat in data):
+            return False, "Categories missing Telugu names"
+        self.category_id = data[0]["id"]  # Store first category ID
+        return True, f"Found {len(data)} categories with Telugu names"
+    
+    @api_test("Get Categories", _check_categories)
+    async def _test_get_categories(self):
+        return await get_categories(self.client)
     
-    def test_product_apis(self):
+    async def test_product_apis(self):
         """Test product APIs"""
         print("\n🛍️ TESTING PRODUCT APIs...")
         
-        # 1. Get all products
+        # Listing all products and by category are independent
+        await asyncio.gather(
+            self._test_get_all_products(),
+            self._test_products_by_category(),
+            self._test_product_paging(),
+            self._test_oversized_page_rejected(),
+            self._test_product_thumbnails(),
+            self._test_malformed_product_id()
+        )
+        await self._test_single_product()
+    
+    def _check_all_products(self, data):
+        if data["count"]:
+            self.product_id = data["first"]["id"]  # Store first product ID
+            return True, f"Found {data['count']} products"
+        return False, "No products found"
+    
+    @api_test("Get All Products", _check_all_products, parse=summarize_items)
+    async def _test_get_all_products(self):
+        return await get_products(self.client, stream=True)
+    
+    @api_test("Get Products by Category", lambda self, data: (
+        (True, f"Found {data['count']} products in category") if data["count"] is not None
+        else (False, "Invalid response format")
+    ), parse=summarize_items)
+    async def _test_products_by_category(self):
+        if self.category_id:
+            return await get_products(self.client, self.category_id, stream=True)
+    
+    @api_test("Get Single Product", lambda self, data: (
+        (True, "Product details retrieved") if data.get("id") == self.product_id
+        else (False, "Product ID mismatch")
+    ))
+    async def _test_single_product(self):
+        if self.product_id:
+            return await get_product(self.client, self.product_id)
+    
+    async def _test_product_paging(self):
+        await self._check_paging("Page Through Products", lambda **page: get_products(self.client, stream=True, **page))
+    
+    @api_test("Reject Oversized Page", lambda self, data: (True, "Rejected with 422"), parse=False, statuses=(422,))
+    async def _test_oversized_page_rejected(self):
+        return await get_products(self.client, limit=MAX_PAGE_SIZE + 1)
+    
+    @api_test("Get Product Thumbnails", lambda self, data: (
+        (True, f"Found {data['count']} thumbnails without images or descriptions")
+        if data["count"] and not {"image", "description", "descriptionTE"} & set(data["first"])
+        else (False, f"Unexpected thumbnail: {data['first']}")
+    ), parse=summarize_items)
+    async def _test_product_thumbnails(self):
+        return await get_products(self.client, stream=True, fields="thumbnail")
+    
+    @api_test("Reject Malformed Product Id", lambda self, data: (True, "Rejected with 400"), parse=False, statuses=(400,))
+    async def _test_malformed_product_id(self):
+        return await get_product(self.client, "not-an-id")
+    
+    async def _count_items(self, request):
+        """Item count of a streamed list response, or None on a non-200"""
+        response = await request
         try:
-            response = self.session.get(f"{self.base_url}/products")
-            
-            if response.status_code == 200:
-                data = response.json()
-                if isinstance(data, list) and len(data) > 0:
-                    self.product_id = data[0]["id"]  # Store first product ID
-                    self.log_test("Get All Products", True, f"Found {len(data)} products")
-                else:
-                    self.log_test("Get All Products", False, "No products found", data)
+            if response.status_code != 200:
+                return None
+            return (await summarize_items(response))["count"]
+        finally:
+            await response.aclose()
+    
+    async def _check_paging(self, name, fetch):
+        """Page through fetch(limit=..., skip=...) and check the pages add up
+        to the unpaged count and none exceeds the page size"""
+        try:
+            start = time.perf_counter_ns()
+            total = await self._count_items(fetch())
+            pages = []
+            while True:
+                count = await self._count_items(fetch(limit=PAGING_PAGE_SIZE, skip=len(pages) * PAGING_PAGE_SIZE))
+                if count is None or count > PAGING_PAGE_SIZE:
+                    pages = None
+                    break
+                pages.append(count)
+                if count < PAGING_PAGE_SIZE:
+                    break
+            duration_ns = time.perf_counter_ns() - start
+            if total is None or pages is None:
+                self.log_test(name, False, "Invalid page response", {"total": total, "pages": pages}, duration_ns)
+            elif sum(pages) != total:
+                self.log_test(name, False, f"Pages add up to {sum(pages)}, expected {total}", pages, duration_ns)
             else:
-                self.log_test("Get All Products", False, f"Status: {response.status_code}", response.text)
+                self.log_test(name, True, f"{total} items over {len(pages)} pages of {PAGING_PAGE_SIZE}", duration_ns=duration_ns)
         except Exception as e:
-            self.log_test("Get All Products", False, f"Exception: {str(e)}")
-        
-        # 2. Get products by category
-        if self.category_id:
-            try:
-                response = self.session.get(f"{self.base_url}/products?categoryId={self.category_id}")
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if isinstance(data, list):
-                        self.log_test("Get Products by Category", True, f"Found {len(data)} products in category")
-                    else:
-                        self.log_test("Get Products by Category", False, "Invalid response format", data)
-                else:
-                    self.log_test("Get Products by Category", False, f"Status: {response.status_code}", response.text)
-            except Exception as e:
-                self.log_test("Get Products by Category", False, f"Exception: {str(e)}")
-        
-        # 3. Get single product
-        if self.product_id:
-            try:
-                response = self.session.get(f"{self.base_url}/products/{self.product_id}")
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("id") == self.product_id:
-                        self.log_test("Get Single Product", True, f"Product details retrieved")
-                    else:
-                        self.log_test("Get Single Product", False, "Product ID mismatch", data)
-                else:
-                    self.log_test("Get Single Product", False, f"Status: {response.status_code}", response.text)
-            except Exception as e:
-                self.log_test("Get Single Product", False, f"Exception: {str(e)}")
+            self.log_test(name, False, f"Exception: {str(e)}")
     
-    def test_cart_apis(self):
+    async def test_cart_apis(self):
         """Test cart APIs for logged in user"""
         print("\n🛒 TESTING CART APIs...")
         
@@ -208,67 +633,38 @@ class KiranaAPITester:
             self.log_test("Cart APIs", False, "Missing user_id or product_id for cart testing")
             return
         
-        # 1. Add to cart
-        try:
-            response = self.session.post(f"{self.base_url}/cart/add?user_id={self.user_id}&product_id={self.product_id}&quantity=2")
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("success"):
-                    self.log_test("Add to Cart", True, "Product added to cart")
-                else:
-                    self.log_test("Add to Cart", False, "Success flag not set", data)
-            else:
-                self.log_test("Add to Cart", False, f"Status: {response.status_code}", response.text)
-        except Exception as e:
-            self.log_test("Add to Cart", False, f"Exception: {str(e)}")
-        
-        # 2. Get cart
-        try:
-            response = self.session.get(f"{self.base_url}/cart/{self.user_id}")
-            
-            if response.status_code == 200:
-                data = response.json()
-                if "items" in data and len(data["items"]) > 0:
-                    self.log_test("Get Cart", True, f"Cart has {len(data['items'])} items")
-                else:
-                    self.log_test("Get Cart", False, "Cart is empty or invalid format", data)
-            else:
-                self.log_test("Get Cart", False, f"Status: {response.status_code}", response.text)
-        except Exception as e:
-            self.log_test("Get Cart", False, f"Exception: {str(e)}")
-        
-        # 3. Update cart item
-        try:
-            response = self.session.put(f"{self.base_url}/cart/update?user_id={self.user_id}&product_id={self.product_id}&quantity=3")
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("success"):
-                    self.log_test("Update Cart Item", True, "Cart item quantity updated")
-                else:
-                    self.log_test("Update Cart Item", False, "Success flag not set", data)
-            else:
-                self.log_test("Update Cart Item", False, f"Status: {response.status_code}", response.text)
-        except Exception as e:
-            self.log_test("Update Cart Item", False, f"Exception: {str(e)}")
-        
-        # 4. Remove from cart
-        try:
-            response = self.session.delete(f"{self.base_url}/cart/remove/{self.user_id}/{self.product_id}")
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("success"):
-                    self.log_test("Remove from Cart", True, "Product removed from cart")
-                else:
-                    self.log_test("Remove from Cart", False, "Success flag not set", data)
-            else:
-                self.log_test("Remove from Cart", False, f"Status: {response.status_code}", response.text)
-        except Exception as e:
-            self.log_test("Remove from Cart", False, f"Exception: {str(e)}")
+        # Each step depends on the cart state left by the previous one
+        await self._test_add_to_cart()
+        await self._test_get_cart()
+        await self._test_update_cart_item()
+        await self._test_remove_from_cart()
+    
+    @api_test("Add to Cart", lambda self, data: (
+        (True, "Product added to cart") if data.get("success") else (False, "Success flag not set")
+    ))
+    async def _test_add_to_cart(self):
+        return await add_to_cart(self.client, self.user_id, self.product_id, 2)
+    
+    @api_test("Get Cart", lambda self, data: (
+        (True, f"Cart has {len(data['items'])} items") if "items" in data and len(data["items"]) > 0
+        else (False, "Cart is empty or invalid format")
+    ))
+    async def _test_get_cart(self):
+        return await get_cart(self.client, self.user_id)
+    
+    @api_test("Update Cart Item", lambda self, data: (
+        (True, "Cart item quantity updated") if data.get("success") else (False, "Success flag not set")
+    ))
+    async def _test_update_cart_item(self):
+        return await update_cart_item(self.client, self.user_id, self.product_id, 3)
+    
+    @api_test("Remove from Cart", lambda self, data: (
+        (True, "Product removed from cart") if data.get("success") else (False, "Success flag not set")
+    ))
+    async def _test_remove_from_cart(self):
+        return await remove_from_cart(self.client, self.user_id, self.product_id)
     
-    def test_order_apis(self):
+    async def test_order_apis(self):
         """Test order APIs"""
         print("\n📦 TESTING ORDER APIs...")
         
@@ -276,199 +672,327 @@ class KiranaAPITester:
             self.log_test("Order APIs", False, "Missing product_id for order testing")
             return
         
-        # 1. Create order (with logged in user)
+        # Both orders are created concurrently, then both are read back
+        await asyncio.gather(
+            self._test_create_user_order(),
+            self._test_create_guest_order()
+        )
+        await asyncio.gather(
+            self._test_get_my_orders(),
+            self._test_get_single_order()
+        )
+    
+    def _check_user_order(self, data):
+        if data.get("id"):
+            self.order_id = data["id"]
+            return True, f"Order created with ID: {self.order_id}"
+        return False, "Order ID not returned"
+    
+    @api_test("Create Order (User)", _check_user_order)
+    async def _test_create_user_order(self):
         if self.user_id:
-            try:
-                order_data = {
-                    "userId": self.user_id,
-                    "items": [
-                        {
-                            "productId": self.product_id,
-                            "productName": "Test Product",
-                            "productNameTE": "టెస్ట్ ప్రొడక్ట్",
-                            "quantity": 2,
-                            "price": 100.0
-                        }
-                    ],
-                    "totalAmount": 200.0,
-                    "deliveryType": "delivery",
-                    "deliveryCharge": 30.0,
-                    "deliveryAddress": {
-                        "label": "Home",
-                        "address": "123 Test Street, Hyderabad",
-                        "landmark": "Near Test Mall"
-                    },
-                    "paymentMethod": "COD"
-                }
-                
-                response = self.session.post(f"{self.base_url}/orders", json=order_data)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("id"):
-                        self.order_id = data["id"]
-                        self.log_test("Create Order (User)", True, f"Order created with ID: {self.order_id}")
-                    else:
-                        self.log_test("Create Order (User)", False, "Order ID not returned", data)
-                else:
-                    self.log_test("Create Order (User)", False, f"Status: {response.status_code}", response.text)
-            except Exception as e:
-                self.log_test("Create Order (User)", False, f"Exception: {str(e)}")
-        
-        # 2. Create guest order
+            return await create_order(self.client, {
+                "userId": self.user_id,
+                "items": [
+                    {
+                        "productId": self.product_id,
+                        "productName": "Test Product",
+                        "productNameTE": "టెస్ట్ ప్రొడక్ట్",
+                        "quantity": 2,
+                        "price": 100.0
+                    }
+                ],
+                "totalAmount": 200.0,
+                "deliveryType": "delivery",
+                "deliveryCharge": 30.0,
+                "deliveryAddress": {
+                    "label": "Home",
+                    "address": "123 Test Street, Hyderabad",
+                    "landmark": "Near Test Mall"
+                },
+                "paymentMethod": "COD"
+            })
+    
+    @api_test("Create Order (Guest)", lambda self, data: (
+        (True, "Guest order created") if data.get("id") else (False, "Order ID not returned")
+    ))
+    async def _test_create_guest_order(self):
         if self.guest_id:
-            try:
-                guest_order_data = {
-                    "guestName": "Priya Sharma",
-                    "guestPhone": "8888888888",
-                    "items": [
-                        {
-                            "productId": self.product_id,
-                            "productName": "Test Product",
-                            "productNameTE": "టెస్ట్ ప్రొడక్ట్",
-                            "quantity": 1,
-                            "price": 100.0
-                        }
-                    ],
-                    "totalAmount": 130.0,
-                    "deliveryType": "delivery",
-                    "deliveryCharge": 30.0,
-                    "deliveryAddress": {
-                        "label": "Office",
-                        "address": "456 Guest Street, Hyderabad",
-                        "landmark": "Near Guest Mall"
-                    },
-                    "paymentMethod": "COD"
-                }
-                
-                response = self.session.post(f"{self.base_url}/orders", json=guest_order_data)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("id"):
-                        self.log_test("Create Order (Guest)", True, f"Guest order created")
-                    else:
-                        self.log_test("Create Order (Guest)", False, "Order ID not returned", data)
-                else:
-                    self.log_test("Create Order (Guest)", False, f"Status: {response.status_code}", response.text)
-            except Exception as e:
-                self.log_test("Create Order (Guest)", False, f"Exception: {str(e)}")
-        
-        # 3. Get my orders
+            return await create_order(self.client, self._guest_order_payload(0))
+    
+    @api_test("Get My Orders", lambda self, data: (
+        (True, f"Found {len(data)} orders for user") if isinstance(data, list)
+        else (False, "Invalid response format")
+    ))
+    async def _test_get_my_orders(self):
         if self.user_id:
-            try:
-                response = self.session.get(f"{self.base_url}/orders/my/{self.user_id}")
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if isinstance(data, list):
-                        self.log_test("Get My Orders", True, f"Found {len(data)} orders for user")
-                    else:
-                        self.log_test("Get My Orders", False, "Invalid response format", data)
-                else:
-                    self.log_test("Get My Orders", False, f"Status: {response.status_code}", response.text)
-            except Exception as e:
-                self.log_test("Get My Orders", False, f"Exception: {str(e)}")
-        
-        # 4. Get single order
+            return await get_my_orders(self.client, self.user_id)
+    
+    @api_test("Get Single Order", lambda self, data: (
+        (True, "Order details retrieved") if data.get("id") == self.order_id
+        else (False, "Order ID mismatch")
+    ))
+    async def _test_get_single_order(self):
         if self.order_id:
-            try:
-                response = self.session.get(f"{self.base_url}/orders/{self.order_id}")
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("id") == self.order_id:
-                        self.log_test("Get Single Order", True, "Order details retrieved")
-                    else:
-                        self.log_test("Get Single Order", False, "Order ID mismatch", data)
-                else:
-                    self.log_test("Get Single Order", False, f"Status: {response.status_code}", response.text)
-            except Exception as e:
-                self.log_test("Get Single Order", False, f"Exception: {str(e)}")
+            return await get_order(self.client, self.order_id)
     
-    def test_admin_apis(self):
+    async def test_admin_apis(self):
         """Test admin APIs"""
         print("\n👨‍💼 TESTING ADMIN APIs...")
         
-        # 1. Get all orders
+        await asyncio.gather(
+            self._test_get_all_orders(),
+            self._test_orders_by_status(),
+            self._test_update_order_status(),
+            self._test_dashboard_analytics(),
+            self._test_order_paging(),
+            self._test_image_flow(),
+            self._test_svg_upload_rejected(),
+            self._test_base64_image_rejected()
+        )
+    
+    @api_test("Get All Orders (Admin)", lambda self, data: (
+        (True, f"Found {data['count']} total orders") if data["count"] is not None
+        else (False, "Invalid response format")
+    ), parse=summarize_items)
+    async def _test_get_all_orders(self):
+        return await get_all_orders(self.client, stream=True)
+    
+    @api_test("Get Orders by Status", lambda self, data: (
+        (True, f"Found {data['count']} pending orders") if data["count"] is not None
+        else (False, "Invalid response format")
+    ), parse=summarize_items)
+    async def _test_orders_by_status(self):
+        return await get_all_orders(self.client, "pending", stream=True)
+    
+    @api_test("Update Order Status", lambda self, data: (
+        (True, "Order status updated to accepted") if data.get("success") else (False, "Success flag not set")
+    ))
+    async def _test_update_order_status(self):
+        if self.order_id:
+            return await update_order_status(self.client, self.order_id, "accepted")
+    
+    @api_test("Dashboard Analytics", lambda self, data: (
+        (True, f"Analytics: {data}")
+        if all(key in data for key in ["todayOrders", "pendingOrders", "todayRevenue", "totalCustomers"])
+        else (False, "Missing analytics keys")
+    ))
+    async def _test_dashboard_analytics(self):
+        return await get_dashboard(self.client)
+    
+    async def _test_order_paging(self):
+        await self._check_paging("Page Through Orders", lambda **page: get_all_orders(self.client, stream=True, **page))
+    
+    async def _test_image_flow(self):
+        # The fetch needs the URL the upload returns
+        await self._test_upload_image()
+        await self._test_get_uploaded_image()
+    
+    def _check_uploaded_image(self, data):
+        if data.get("success") and data.get("url"):
+            self.image_url = data["url"]
+            return True, f"Image stored at {self.image_url}"
+        return False, "Invalid response format"
+    
+    @api_test("Upload Product Image", _check_uploaded_image)
+    async def _test_upload_image(self):
+        return await upload_product_image(self.client, "test.png", TEST_PNG, "image/png")
+    
+    @api_test("Get Uploaded Image", lambda self, data: (
+        (True, "Image round-tripped with nosniff") if data["content"] == TEST_PNG
+        and data["contentType"] == "image/png" and data["nosniff"]
+        else (False, f"Got {len(data['content'])} bytes as {data['contentType']}, nosniff={data['nosniff']}")
+    ), parse=read_image)
+    async def _test_get_uploaded_image(self):
+        if self.image_url:
+            return await get_product_image(self.client, self.image_url)
+    
+    @api_test("Reject SVG Upload", lambda self, data: (True, "Rejected with 400"), parse=False, statuses=(400,))
+    async def _test_svg_upload_rejected(self):
+        svg = b'<svg xmlns="http://www.w3.org/2000/svg"><script>alert(1)</script></svg>'
+        return await upload_product_image(self.client, "test.svg", svg, "image/svg+xml")
+    
+    @api_test("Reject Base64 Product Image", lambda self, data: (True, "Rejected with 422"), parse=False, statuses=(422,))
+    async def _test_base64_image_rejected(self):
+        return await create_product(self.client, {
+            "name": "Test Product",
+            "nameTE": "టెస్ట్ ప్రొడక్ట్",
+            "categoryId": self.category_id or "test",
+            "price": 100.0,
+            "unit": "piece",
+            "stock": 1,
+            "image": "data:image/png;base64," + base64.b64encode(TEST_PNG).decode()
+        })
+    
+    async def test_openapi_endpoints(self):
+        """GET every endpoint in the app's OpenAPI schema that the collected ids can fill in"""
+        print("\n🧭 TESTING OPENAPI GET ENDPOINTS...")
         try:
-            response = self.session.get(f"{self.base_url}/admin/orders")
-            
-            if response.status_code == 200:
-                data = response.json()
-                if isinstance(data, list):
-                    self.log_test("Get All Orders (Admin)", True, f"Found {len(data)} total orders")
-                else:
-                    self.log_test("Get All Orders (Admin)", False, "Invalid response format", data)
-            else:
-                self.log_test("Get All Orders (Admin)", False, f"Status: {response.status_code}", response.text)
+            schema = await fetch_schema(self.client)
         except Exception as e:
-            self.log_test("Get All Orders (Admin)", False, f"Exception: {str(e)}")
+            self.log_test("Fetch OpenAPI Schema", False, f"Exception: {str(e)}")
+            return
         
-        # 2. Get orders by status
+        values = {"user_id": self.user_id, "product_id": self.product_id, "order_id": self.order_id}
+        checks = [
+            api_test(f"OpenAPI {summary}", lambda self, data, url=url: (True, f"GET {url}"), parse=False)(
+                lambda self, url=url: status_only(self.client, "GET", self.client.base_url.join(url))
+            )
+            for summary, url in get_requests(schema, values)
+        ]
+        await asyncio.gather(*(check(self) for check in checks))
+    
+    @contextlib.asynccontextmanager
+    async def _connected(self):
+        """Open self.client for the duration of a run"""
+        async with contextlib.AsyncExitStack() as stack:
+            app = None
+            if self.inprocess:
+                from backend.server import app
+                # ASGITransport doesn't send lifespan events, so run the
+                # app's startup/shutdown handlers around the run
+                await stack.enter_async_context(app.router.lifespan_context(app))
+            self.client = await stack.enter_async_context(make_client(self.base_url, app))
+            yield
+    
+    async def _run_suite(self, name, durations):
+        current_suite.set(name)
+        start = time.perf_counter()
+        await getattr(self, SUITES[name])()
+        durations[name] = round(time.perf_counter() - start, 3)
+    
+    async def _restore_state(self):
+        """Load ids from STATE_FILE if its user still exists and return the
+        suites that no longer need to run: auth, plus seed if the stored
+        product exists too. Ids already set (e.g. from --order-id) are kept."""
+        if not STATE_FILE.exists():
+            return []
         try:
-            response = self.session.get(f"{self.base_url}/admin/orders?status=pending")
-            
-            if response.status_code == 200:
-                data = response.json()
-                if isinstance(data, list):
-                    self.log_test("Get Orders by Status", True, f"Found {len(data)} pending orders")
-                else:
-                    self.log_test("Get Orders by Status", False, "Invalid response format", data)
-            else:
-                self.log_test("Get Orders by Status", False, f"Status: {response.status_code}", response.text)
-        except Exception as e:
-            self.log_test("Get Orders by Status", False, f"Exception: {str(e)}")
-        
-        # 3. Update order status
-        if self.order_id:
-            try:
-                response = self.session.put(f"{self.base_url}/admin/orders/{self.order_id}/status?status=accepted")
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("success"):
-                        self.log_test("Update Order Status", True, "Order status updated to accepted")
-                    else:
-                        self.log_test("Update Order Status", False, "Success flag not set", data)
-                else:
-                    self.log_test("Update Order Status", False, f"Status: {response.status_code}", response.text)
-            except Exception as e:
-                self.log_test("Update Order Status", False, f"Exception: {str(e)}")
-        
-        # 4. Get dashboard analytics
+            state = orjson.loads(STATE_FILE.read_bytes())
+        except orjson.JSONDecodeError as e:
+            print(f"⚠️  Ignoring unreadable {STATE_FILE}: {e}")
+            return []
+        if not isinstance(state, dict) or not state.get("user_id"):
+            return []
+        probes = [status_only(self.client, "GET", URLS.user(state["user_id"]))]
+        if state.get("product_id"):
+            probes.append(status_only(self.client, "GET", URLS.product(state["product_id"])))
         try:
-            response = self.session.get(f"{self.base_url}/admin/analytics/dashboard")
-            
-            if response.status_code == 200:
-                data = response.json()
-                expected_keys = ["todayOrders", "pendingOrders", "todayRevenue", "totalCustomers"]
-                if all(key in data for key in expected_keys):
-                    self.log_test("Dashboard Analytics", True, f"Analytics: {data}")
-                else:
-                    self.log_test("Dashboard Analytics", False, f"Missing analytics keys", data)
-            else:
-                self.log_test("Dashboard Analytics", False, f"Status: {response.status_code}", response.text)
+            user, *product = await asyncio.gather(*probes)
         except Exception as e:
-            self.log_test("Dashboard Analytics", False, f"Exception: {str(e)}")
+            print(f"⚠️  Ignoring {STATE_FILE}, couldn't check it against the backend: {e}")
+            return []
+        if user.status_code != 200:
+            return []
+        for key in STATE_KEYS:
+            if getattr(self, key) is None:
+                setattr(self, key, state.get(key))
+        return ["auth", "seed"] if product and product[0].status_code == 200 else ["auth"]
     
-    def run_all_tests(self):
-        """Run all test suites"""
+    async def run_all_tests(self, only=None, skip=(), provided=(), fresh=False):
+        """Run the selected test suites (all by default) and their dependencies"""
         print(f"🚀 STARTING KIRANA SHOP BACKEND API TESTS")
         print(f"📍 Base URL: {self.base_url}")
-        print("=" * 60)
         
-        # Run tests in sequence
-        self.test_seed_data()
-        self.test_auth_apis()
-        self.test_category_apis()
-        self.test_product_apis()
-        self.test_cart_apis()
-        self.test_order_apis()
-        self.test_admin_apis()
+        durations = {}
+        async with self._connected():
+            provided = list(provided)
+            restored = [] if fresh else await self._restore_state()
+            if restored:
+                print(f"♻️  Reusing state from {STATE_FILE} (skipping {', '.join(restored)})")
+                provided += restored
+            suites = resolve_suites(only, skip, provided)
+            print(f"🧪 Suites: {', '.join(name for name in SUITES if name in suites)}")
+            print("=" * 60)
+            
+            for phase in PHASES:
+                await asyncio.gather(*(self._run_suite(name, durations) for name in phase if name in suites))
+        
+        failed = sorted({result["suite"] for result in self.test_results if not result["success"]})
+        RESULTS_CACHE.write_bytes(orjson.dumps(
+            {"failed": failed, "durations": durations},
+            option=orjson.OPT_INDENT_2
+        ))
+        # Ids from a failed seed or login aren't worth reusing
+        if self.user_id and not set(STATE_SUITES) & set(failed):
+            STATE_FILE.write_bytes(orjson.dumps(
+                {key: getattr(self, key) for key in STATE_KEYS},
+                option=orjson.OPT_INDENT_2
+            ))
         
         # Print summary
-        self.print_summary()
+        return self.print_summary()
+    
+    async def run_load_test(self, users, duration, csv_path=LOAD_CSV):
+        """Hit LOAD_TASKS with `users` concurrent virtual users for `duration`
+        seconds and report throughput and latency percentiles per endpoint"""
+        print(f"🚀 STARTING KIRANA SHOP LOAD TEST")
+        print(f"📍 Base URL: {self.base_url}")
+        print(f"👥 Users: {users}, Duration: {duration}s")
+        print("=" * 60)
+        
+        latencies = defaultdict(list)
+        statuses = defaultdict(Counter)
+        
+        async def virtual_user(index, deadline):
+            rng = random.Random(index)
+            iteration = 0
+            while time.perf_counter() < deadline:
+                name, build = rng.choice(self.LOAD_TASKS)
+                start = time.perf_counter()
+                try:
+                    response = await build(self, iteration)
+                    statuses[name][response.status_code] += 1
+                except Exception as e:
+                    statuses[name][type(e).__name__] += 1
+                latencies[name].append(time.perf_counter() - start)
+                iteration += 1
+        
+        async with self._connected():
+            # The tasks need category and product ids
+            await self.test_seed_data()
+            await self.test_category_apis()
+            await self.test_product_apis()
+            if not (self.category_id and self.product_id):
+                return self.print_summary()
+            
+            print("\n🔥 RUNNING LOAD...")
+            start = time.perf_counter()
+            deadline = start + duration
+            await asyncio.gather(*(virtual_user(i, deadline) for i in range(users)))
+            # Users finish their in-flight request after the deadline
+            elapsed = time.perf_counter() - start
+        
+        rows = []
+        for name, _ in self.LOAD_TASKS:
+            samples = latencies.get(name)
+            if not samples:
+                continue
+            percentiles = latency_percentiles(samples)
+            rows.append({
+                "endpoint": name,
+                "requests": len(samples),
+                "failures": sum(n for status, n in statuses[name].items() if status != 200),
+                "rps": round(len(samples) / elapsed, 2),
+                **{key: round(value * 1000, 2) for key, value in percentiles.items()}
+            })
+        
+        print("\n" + "=" * 60)
+        print("📊 LOAD TEST SUMMARY (latencies in ms)")
+        print("=" * 60)
+        print(f"{'Endpoint':<32} {'Reqs':>7} {'Fail':>6} {'RPS':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+        for row in rows:
+            print(f"{row['endpoint']:<32} {row['requests']:>7} {row['failures']:>6} {row['rps']:>8} "
+                  f"{row['p50']:>8} {row['p95']:>8} {row['p99']:>8}")
+        
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["endpoint", "requests", "failures", "rps", "p50", "p95", "p99"])
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"\n📝 Stats written to {csv_path}")
+        
+        print("\n" + "=" * 60)
+        return all(row["failures"] == 0 for row in rows)
     
     def print_summary(self):
         """Print test summary"""
@@ -481,6 +1005,10 @@ class KiranaAPITester:
         failed_tests = total_tests - passed_tests
         
         print(f"Total Tests: {total_tests}")
+        if total_tests == 0:
+            print("⚠️  No tests ran (check --only/--skip)")
+            print("\n" + "=" * 60)
+            return True
         print(f"✅ Passed: {passed_tests}")
         print(f"❌ Failed: {failed_tests}")
         print(f"Success Rate: {(passed_tests/total_tests)*100:.1f}%")
@@ -491,10 +1019,95 @@ class KiranaAPITester:
                 if not result["success"]:
                     print(f"   ❌ {result['test']}: {result['message']}")
         
+        self.print_timings()
+        
         print("\n" + "=" * 60)
         return failed_tests == 0
+    
+    def print_timings(self):
+        """Print per-check request latencies and the slowest checks; the
+        min/p95/p99 columns only appear for checks with repeated samples"""
+        timings = defaultdict(list)
+        for result in self.test_results:
+            if result["duration_ns"] is not None:
+                timings[result["test"]].append(result["duration_ns"] / 1e6)
+        if not timings:
+            return
+        
+        rows = []
+        for name, samples in timings.items():
+            row = {"test": name, "n": len(samples), "avg": statistics.fmean(samples)}
+            if len(samples) > 1:
+                percentiles = latency_percentiles(sorted(samples))
+                row.update(min=min(samples), p95=percentiles["p95"], p99=percentiles["p99"])
+            rows.append(row)
+        
+        print("\n⏱️  REQUEST TIMINGS (ms):")
+        if all(row["n"] == 1 for row in rows):
+            print(f"   {'Test':<32} {'ms':>8}")
+            for row in rows:
+                print(f"   {row['test']:<32} {row['avg']:>8.2f}")
+        else:
+            print(f"   {'Test':<32} {'n':>5} {'avg':>8} {'min':>8} {'p95':>8} {'p99':>8}")
+            for row in rows:
+                stats = " ".join(f"{row[key]:>8.2f}" if key in row else f"{'-':>8}" for key in ("min", "p95", "p99"))
+                print(f"   {row['test']:<32} {row['n']:>5} {row['avg']:>8.2f} {stats}")
+        
+        print("\n🐢 SLOWEST:")
+        for row in sorted(rows, key=lambda row: row["avg"], reverse=True)[:5]:
+            print(f"   {row['test']}: {row['avg']:.2f} ms")
 
-if __name__ == "__main__":
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kirana Shop backend API tests")
+    suite_list = lambda value: [name.strip() for name in value.split(",") if name.strip()]
+    parser.add_argument(
+        "--only", type=suite_list, metavar="SUITES",
+        help=f"comma-separated suites to run, plus the suites they depend on ({', '.join(SUITES)})"
+    )
+    parser.add_argument("--skip", type=suite_list, default=[], metavar="SUITES", help="comma-separated suites to leave out")
+    parser.add_argument("--rerun-failed", action="store_true", help=f"only rerun the suites that failed last time ({RESULTS_CACHE})")
+    parser.add_argument("--fresh", action="store_true", help=f"ignore saved ids ({STATE_FILE}) and run seed and auth again")
+    parser.add_argument("--order-id", help="existing order to use for the admin checks instead of creating one")
+    parser.add_argument(
+        "--load", nargs="+", metavar="KEY=VALUE",
+        help=f"run a load test instead, e.g. --load users=50 duration=30 [csv={LOAD_CSV}]"
+    )
+    args = parser.parse_args(argv)
+    
+    unknown = [name for name in (args.only or []) + args.skip if name not in SUITES]
+    if unknown:
+        parser.error(f"unknown suites: {', '.join(unknown)} (choose from {', '.join(SUITES)})")
+    
     tester = KiranaAPITester()
-    success = tester.run_all_tests()
+    if args.load:
+        options = {"users": "10", "duration": "30", "csv": LOAD_CSV}
+        for option in args.load:
+            key, sep, value = option.partition("=")
+            if not sep or key not in options:
+                parser.error(f"--load expects KEY=VALUE with KEY one of {', '.join(options)}, got {option!r}")
+            options[key] = value
+        try:
+            users, duration = int(options["users"]), float(options["duration"])
+        except ValueError:
+            parser.error("--load users must be an integer and duration a number")
+        if users < 1 or duration <= 0:
+            parser.error("--load users and duration must be positive")
+        return asyncio.run(tester.run_load_test(users, duration, options["csv"]))
+    
+    only = args.only
+    if args.rerun_failed and RESULTS_CACHE.exists():
+        only = orjson.loads(RESULTS_CACHE.read_bytes())["failed"]
+        if not only:
+            print(f"✅ Nothing failed last time ({RESULTS_CACHE}), nothing to rerun")
+            return True
+    
+    provided = []
+    if args.order_id:
+        tester.order_id = args.order_id
+        provided.append("order")
+    
+    return asyncio.run(tester.run_all_tests(only, args.skip, provided, args.fresh))
+
+if __name__ == "__main__":
+    success = main()
     sys.exit(0 if success else 1)
\ No newline at end of file
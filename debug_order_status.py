@@ -1,22 +1,78 @@
 #!/usr/bin/env python3
-import requests
+# Probe the order status update endpoint with concurrent requests to catch
+# intermittent failures; prints the status-code distribution and latencies.
+# Runs against backend/server.py's app in-process (MONGO_URL and DB_NAME must
+# be set, and an order id from that database given) unless --remote is given.
+import argparse
+import asyncio
+import sys
+import time
+from collections import Counter
 
-# Test the specific failing endpoint
-BASE_URL = "https://quick-kirana-6.preview.emergentagent.com/api"
-order_id = "697255b92b4abef7bd38a52b"
+import numpy
 
-print("Testing order status update endpoint...")
+from backend_test import KiranaAPITester, get_order, update_order_status
 
-try:
-    # Test with requests library
-    response = requests.put(f"{BASE_URL}/admin/orders/{order_id}/status?status=accepted")
-    print(f"Status Code: {response.status_code}")
-    print(f"Response: {response.text}")
-    print(f"Headers: {response.headers}")
+# Order on the deployed backend that showed the failure
+DEFAULT_ORDER_ID = "697255b92b4abef7bd38a52b"
+CONCURRENCY = 50
+TOTAL = 500
+
+async def probe(client, semaphore, order_id):
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            response = await update_order_status(client, order_id, "accepted")
+            outcome = response.status_code
+        except Exception as e:
+            outcome = type(e).__name__
+        return outcome, time.perf_counter() - start
+
+async def main(order_id=DEFAULT_ORDER_ID, concurrency=CONCURRENCY, total=TOTAL, remote=False):
+    tester = KiranaAPITester(inprocess=not remote)
+    print(f"Probing order status update for {order_id} at {tester.base_url}: {total} requests, {concurrency} concurrent...")
     
-    if response.status_code != 200:
-        print("Error details:")
-        print(f"Reason: {response.reason}")
+    semaphore = asyncio.Semaphore(concurrency)
+    async with tester._connected():
+        # The status update reports success even when no order matches, so
+        # make sure the probe is exercising a real one
+        response = await get_order(tester.client, order_id)
+        if response.status_code != 200:
+            print(f"Order {order_id} not found (GET /orders/{order_id}: {response.status_code})")
+            return False
         
-except Exception as e:
-    print(f"Exception: {str(e)}")
\ No newline at end of file
+        start = time.perf_counter()
+        results = await asyncio.gather(*(probe(tester.client, semaphore, order_id) for _ in range(total)))
+        elapsed = time.perf_counter() - start
+    
+    statuses = Counter(outcome for outcome, _ in results)
+    latencies = numpy.array([latency for _, latency in results]) * 1000
+    
+    print(f"\nCompleted in {elapsed:.2f}s ({total / elapsed:.1f} req/s)")
+    print("\nStatus codes:")
+    for outcome, count in statuses.most_common():
+        print(f"   {outcome}: {count} ({count / total:.1%})")
+    
+    print("\nLatency (ms):")
+    for label, value in zip(("p50", "p90", "p95", "p99", "max"), numpy.percentile(latencies, [50, 90, 95, 99, 100])):
+        print(f"   {label}: {value:.1f}")
+    
+    counts, edges = numpy.histogram(latencies, bins=10)
+    print("\nHistogram (ms):")
+    for count, low, high in zip(counts, edges, edges[1:]):
+        print(f"   {low:8.1f} - {high:8.1f} | {'#' * round(40 * count / counts.max())} {count}")
+    
+    return statuses.get(200, 0) == total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent probe of PUT /admin/orders/{id}/status")
+    parser.add_argument("order_id", nargs="?", help=f"order to update (required in-process; --remote defaults to {DEFAULT_ORDER_ID})")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--total", type=int, default=TOTAL)
+    parser.add_argument("--remote", action="store_true", help="probe the deployed backend instead of the in-process app")
+    args = parser.parse_args()
+    if args.order_id is None:
+        if not args.remote:
+            parser.error("an order id from the local database is required unless --remote is given")
+        args.order_id = DEFAULT_ORDER_ID
+    sys.exit(0 if asyncio.run(main(args.order_id, args.concurrency, args.total, args.remote)) else 1)
\ No newline at end of file